@@ -45,6 +45,15 @@ BOT_TOKEN = os.getenv('BOT_TOKEN') or 'VOTRE_BOT_TOKEN_REEL'
 
 PORT = int(os.getenv('PORT') or '5000')  # Port 5000 for Replit
 
+# --- Haute disponibilité (actif / veille) ---
+# Chemin du fichier SQLite partagé par les instances. Vide = une seule instance, toujours leader.
+LEADER_LOCK_PATH = os.getenv('LEADER_LOCK_PATH') or ''
+# Identifiant de l'instance (par défaut: nom d'hôte + PID)
+INSTANCE_ID = os.getenv('INSTANCE_ID') or ''
+# Durée du bail et intervalle de renouvellement (secondes) : bascule en moins d'une seconde
+LEADER_LEASE_TTL = float(os.getenv('LEADER_LEASE_TTL') or '0.75')
+LEADER_RENEW_INTERVAL = float(os.getenv('LEADER_RENEW_INTERVAL') or '0.15')
+
 # --- Mapping des Couleurs pour la Règle de Prédiction ---
 # Logique: {Couleur Manquante: Couleur Prédite}
 SUIT_MAPPING = {
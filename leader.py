@@ -0,0 +1,304 @@
+"""
+Élection de leader locale (actif / veille) basée sur un bail SQLite.
+
+Deux instances du bot peuvent tourner sur la même machine en partageant le
+même fichier SQLite : une seule (le leader) publie dans le canal de prédiction
+et écrit à l'administrateur, l'autre consomme les mêmes événements pour garder
+son état à jour et reprend la main dès que le bail du leader expire.
+"""
+import hashlib
+import os
+import socket
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Les envois enregistrés sont conservés 2 jours (les numéros de jeu repartent à zéro chaque jour)
+SENT_RETENTION_SECONDS = 2 * 24 * 3600
+# Attente maximale sur un verrou SQLite pour le registre des envois (appelé hors de la boucle asyncio)
+SENT_BUSY_TIMEOUT = 1.0
+
+
+class RegistryError(Exception):
+    """Registre des envois inaccessible : l'opération doit être retentée plus tard."""
+
+
+def default_instance_id() -> str:
+    """Identifiant unique de l'instance : nom d'hôte + PID."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaderElection:
+    """
+    Bail de leadership stocké dans une base SQLite locale.
+
+    - Le leader renouvelle son bail toutes les `renew_interval` secondes.
+    - Une instance en veille ne prend le bail que lorsqu'il est expiré.
+    - Le leader se considère comme tel jusqu'à `expires_at - renew_interval`,
+      ce qui laisse une marge avant que la veille ne puisse prendre le relais.
+    - La table `sent` enregistre chaque envoi (clé -> message_id, valeur, statut)
+      pour qu'un même message ne soit jamais publié deux fois, même lors d'une
+      bascule, et que la nouvelle instance leader puisse reprendre les messages.
+    - La table `sessions` empêche deux instances vivantes d'utiliser la même
+      session Telegram : la seconde n'est jamais éligible au leadership.
+
+    Si `db_path` est vide, l'élection est désactivée : l'instance est toujours
+    leader (fonctionnement historique avec une seule instance).
+
+    Le bail et le registre utilisent chacun leur connexion et leur verrou :
+    `try_acquire` (appelée via `asyncio.to_thread`) n'attend jamais derrière un
+    envoi, et inversement. Les méthodes du registre lèvent `RegistryError`
+    en cas d'erreur SQLite, distincte d'un envoi déjà réservé.
+    """
+
+    def __init__(self, db_path: str, instance_id: str = None,
+                 lease_ttl: float = 0.75, renew_interval: float = 0.15,
+                 name: str = 'bot', session: str = ''):
+        self.db_path = db_path
+        self.instance_id = instance_id or default_instance_id()
+        self.lease_ttl = lease_ttl
+        self.renew_interval = renew_interval
+        self.name = name
+        # Empreinte de la session Telegram (vide = nouvelle session propre à l'instance)
+        self.session_fingerprint = hashlib.sha256(session.encode()).hexdigest() if session else ''
+        # Attente maximale sur un verrou SQLite, bien inférieure à l'intervalle de renouvellement
+        self.busy_timeout = renew_interval / 3
+        self._expires_at = 0.0
+        self._session_conflict = False
+        self._closed = False
+        self._lease_lock = threading.Lock()
+        self._sent_lock = threading.Lock()
+        self._lease_conn = None
+        self._sent_conn = None
+
+        # Après un renouvellement, le leader reste valide `lease_ttl - renew_interval` secondes :
+        # cette fenêtre doit couvrir l'attente jusqu'au renouvellement suivant et son aller-retour.
+        if not 0 < renew_interval < lease_ttl:
+            raise ValueError(
+                f"Intervalle de renouvellement invalide ({renew_interval}s): "
+                f"il doit être > 0 et < durée du bail ({lease_ttl}s)"
+            )
+        if lease_ttl <= 2 * renew_interval + self.busy_timeout:
+            raise ValueError(
+                f"Durée du bail trop courte ({lease_ttl}s): "
+                f"elle doit dépasser {2 * renew_interval + self.busy_timeout:.3f}s "
+                f"(2 x renouvellement + attente SQLite)"
+            )
+
+        if self.enabled:
+            self._lease_conn = sqlite3.connect(
+                db_path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False
+            )
+            self._lease_conn.execute("PRAGMA journal_mode=WAL")
+            self._lease_conn.execute(
+                "CREATE TABLE IF NOT EXISTS lease ("
+                "name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._lease_conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "fingerprint TEXT PRIMARY KEY, holder TEXT NOT NULL, seen_at REAL NOT NULL)"
+            )
+            self._lease_conn.execute(
+                "CREATE TABLE IF NOT EXISTS sent ("
+                "key TEXT PRIMARY KEY, message_id INTEGER NOT NULL DEFAULT 0, "
+                "value TEXT NOT NULL DEFAULT '', status TEXT NOT NULL DEFAULT '', "
+                "holder TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._sent_conn = sqlite3.connect(
+                db_path, timeout=SENT_BUSY_TIMEOUT, isolation_level=None, check_same_thread=False
+            )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.db_path)
+
+    def is_leader(self) -> bool:
+        """Vrai si cette instance détient un bail encore valide (avec marge de sécurité)."""
+        if not self.enabled:
+            return True
+        return time.time() < self._expires_at - self.renew_interval
+
+    # --- Bail de leadership ---
+
+    def try_acquire(self) -> bool:
+        """Prend ou renouvelle le bail si possible. Retourne True si l'instance est leader."""
+        if not self.enabled:
+            return True
+
+        with self._lease_lock:
+            if self._closed:
+                return False
+
+            was_leader = self.is_leader()
+            try:
+                now = time.time()
+                self._lease_conn.execute("BEGIN IMMEDIATE")
+                try:
+                    eligible = self._refresh_session(now)
+                    row = self._lease_conn.execute(
+                        "SELECT holder, expires_at FROM lease WHERE name = ?", (self.name,)
+                    ).fetchone()
+
+                    if eligible and (row is None or row[0] == self.instance_id or row[1] <= now):
+                        expires_at = now + self.lease_ttl
+                        self._lease_conn.execute(
+                            "INSERT OR REPLACE INTO lease (name, holder, expires_at) VALUES (?, ?, ?)",
+                            (self.name, self.instance_id, expires_at)
+                        )
+                        self._expires_at = expires_at
+                    else:
+                        if not eligible and row is not None and row[0] == self.instance_id:
+                            self._lease_conn.execute(
+                                "DELETE FROM lease WHERE name = ? AND holder = ?",
+                                (self.name, self.instance_id)
+                            )
+                        self._expires_at = 0.0
+                    self._lease_conn.execute("COMMIT")
+                except Exception:
+                    self._lease_conn.execute("ROLLBACK")
+                    raise
+            except sqlite3.Error as e:
+                # Sans accès au bail, on ne peut plus garantir l'exclusivité : on se met en veille
+                logger.error(f"❌ Erreur bail de leadership: {e}")
+                self._expires_at = 0.0
+
+            leader = self.is_leader()
+            if leader and not was_leader:
+                logger.warning(f"👑 Instance {self.instance_id} devient LEADER")
+            elif was_leader and not leader:
+                logger.warning(f"💤 Instance {self.instance_id} passe en VEILLE")
+            return leader
+
+    def _refresh_session(self, now: float) -> bool:
+        """Signale l'utilisation de la session. False si une autre instance vivante l'utilise déjà."""
+        if not self.session_fingerprint:
+            return True
+
+        row = self._lease_conn.execute(
+            "SELECT holder, seen_at FROM sessions WHERE fingerprint = ?", (self.session_fingerprint,)
+        ).fetchone()
+        if row is not None and row[0] != self.instance_id and row[1] > now - 2 * self.lease_ttl:
+            if not self._session_conflict:
+                logger.error(
+                    f"❌ Session Telegram déjà utilisée par l'instance {row[0]}: "
+                    f"chaque instance doit avoir sa propre TELEGRAM_SESSION"
+                )
+            self._session_conflict = True
+            return False
+
+        self._session_conflict = False
+        self._lease_conn.execute(
+            "INSERT OR REPLACE INTO sessions (fingerprint, holder, seen_at) VALUES (?, ?, ?)",
+            (self.session_fingerprint, self.instance_id, now)
+        )
+        return True
+
+    def session_in_use(self) -> bool:
+        """Vrai si une autre instance vivante utilise la même session Telegram."""
+        if not self.enabled or not self.session_fingerprint:
+            return False
+        with self._lease_lock:
+            try:
+                row = self._lease_conn.execute(
+                    "SELECT holder, seen_at FROM sessions WHERE fingerprint = ?",
+                    (self.session_fingerprint,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.error(f"❌ Erreur lecture des sessions: {e}")
+                return False
+        return row is not None and row[0] != self.instance_id and row[1] > time.time() - 2 * self.lease_ttl
+
+    def release(self):
+        """Libère le bail immédiatement pour que la veille prenne le relais sans attendre."""
+        if not self.enabled:
+            return
+        with self._lease_lock:
+            self._release()
+
+    def _release(self):
+        self._expires_at = 0.0
+        if self._lease_conn is None:
+            return
+        try:
+            self._lease_conn.execute(
+                "DELETE FROM lease WHERE name = ? AND holder = ?", (self.name, self.instance_id)
+            )
+            logger.info(f"Bail de leadership libéré par {self.instance_id}")
+        except sqlite3.Error as e:
+            logger.error(f"❌ Erreur libération du bail: {e}")
+
+    # --- Registre des envois (anti double publication) ---
+
+    def _sent_execute(self, sql: str, params=()):
+        if not self.enabled:
+            return None
+        with self._sent_lock:
+            if self._closed:
+                raise RegistryError("registre des envois fermé")
+            try:
+                return self._sent_conn.execute(sql, params)
+            except sqlite3.Error as e:
+                raise RegistryError(str(e)) from e
+
+    def claim(self, key: str, value: str = '', status: str = '') -> bool:
+        """Réserve un envoi. Retourne False si une instance l'a déjà réservé."""
+        if not self.enabled:
+            return True
+        cursor = self._sent_execute(
+            "INSERT OR IGNORE INTO sent (key, value, status, holder, created_at) VALUES (?, ?, ?, ?, ?)",
+            (key, value, status, self.instance_id, time.time())
+        )
+        return cursor.rowcount == 1
+
+    def unclaim(self, key: str):
+        """Annule une réservation dont le message n'a pas été publié (envoi en échec ou abandonné)."""
+        self._sent_execute("DELETE FROM sent WHERE key = ? AND message_id <= 0", (key,))
+
+    def update_sent(self, key: str, message_id: int = None, status: str = None):
+        """Enregistre l'ID du message publié et/ou son dernier statut publié."""
+        if message_id is not None:
+            self._sent_execute("UPDATE sent SET message_id = ? WHERE key = ?", (message_id, key))
+        if status is not None:
+            self._sent_execute("UPDATE sent SET status = ? WHERE key = ?", (status, key))
+
+    def get_sent(self, key: str):
+        """Retourne l'envoi enregistré pour cette clé (dict) ou None s'il n'a jamais été réservé."""
+        cursor = self._sent_execute(
+            "SELECT message_id, value, status, holder, created_at FROM sent WHERE key = ?", (key,)
+        )
+        row = cursor.fetchone() if cursor is not None else None
+        if row is None:
+            return None
+        return {'message_id': row[0], 'value': row[1], 'status': row[2],
+                'holder': row[3], 'created_at': row[4]}
+
+    def purge_sent(self):
+        """Supprime les envois plus anciens que la durée de rétention."""
+        self._sent_execute(
+            "DELETE FROM sent WHERE created_at < ?", (time.time() - SENT_RETENTION_SECONDS,)
+        )
+
+    def close(self):
+        """Libère le bail et ferme la base : plus aucune reprise du bail n'est possible."""
+        with self._lease_lock, self._sent_lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self.enabled:
+                self._release()
+                if self.session_fingerprint:
+                    try:
+                        self._lease_conn.execute(
+                            "DELETE FROM sessions WHERE fingerprint = ? AND holder = ?",
+                            (self.session_fingerprint, self.instance_id)
+                        )
+                    except sqlite3.Error as e:
+                        logger.error(f"❌ Erreur libération de la session: {e}")
+            for conn in (self._lease_conn, self._sent_conn):
+                if conn is not None:
+                    conn.close()
+            self._lease_conn = None
+            self._sent_conn = None
@@ -3,6 +3,7 @@ import asyncio
 import re
 import logging
 import sys
+import signal
 from datetime import datetime, timedelta, timezone, time
 from telethon import TelegramClient, events
 from telethon.sessions import StringSession
@@ -11,8 +12,10 @@ from aiohttp import web
 from config import (
     API_ID, API_HASH, BOT_TOKEN, ADMIN_ID,
     SOURCE_CHANNEL_ID, PREDICTION_CHANNEL_ID, PORT,
-    SUIT_MAPPING, ALL_SUITS, SUIT_DISPLAY
+    SUIT_MAPPING, ALL_SUITS, SUIT_DISPLAY,
+    LEADER_LOCK_PATH, INSTANCE_ID, LEADER_LEASE_TTL, LEADER_RENEW_INTERVAL
 )
+from leader import LeaderElection, RegistryError
 
 # --- Constantes Globales Mises à Jour ---
 MAX_PENDING_PREDICTIONS = 2  
@@ -43,9 +46,23 @@ if not BOT_TOKEN:
 logger.info(f"Configuration: SOURCE_CHANNEL={SOURCE_CHANNEL_ID}, PREDICTION_CHANNEL={PREDICTION_CHANNEL_ID}")
 
 # Initialisation du client Telegram avec session string ou nouvelle session
+# (en actif / veille, chaque instance doit avoir sa propre session)
 session_string = os.getenv('TELEGRAM_SESSION', '')
 client = TelegramClient(StringSession(session_string), API_ID, API_HASH)
 
+# Élection de leader : seul le leader publie, la veille garde son état à jour
+try:
+    election = LeaderElection(
+        LEADER_LOCK_PATH,
+        instance_id=INSTANCE_ID or None,
+        lease_ttl=LEADER_LEASE_TTL,
+        renew_interval=LEADER_RENEW_INTERVAL,
+        session=session_string
+    )
+except ValueError as e:
+    logger.error(f"Configuration du bail invalide: {e}")
+    exit(1)
+
 # --- Variables Globales d'État ---
 pending_predictions = {}
 queued_predictions = {}
@@ -59,6 +76,16 @@ source_channel_ok = False
 prediction_channel_ok = False
 transfer_enabled = True 
 
+# Envois non publiés pendant la veille, rejoués lors de la promotion en leader
+unsynced_predictions = {}
+skipped_transfers = []
+
+FINAL_STATUSES = ['✅0️⃣', '✅1️⃣', '✅2️⃣', '❌']
+REPLAY_INTERVAL = 1.0        # Délai minimal entre deux rejeux des envois en attente
+STALE_CLAIM_SECONDS = 30     # Réservation sans message publié au-delà de ce délai : envoi abandonné
+
+WAT_TZ = timezone(timedelta(hours=1))
+
 # --- Fonctions d'Analyse ---
 
 def extract_game_number(message: str):
@@ -87,8 +114,104 @@ def get_predicted_suit(missing_suit: str) -> str:
     """Applique le mapping personnalisé (couleur manquante -> couleur prédite)."""
     return SUIT_MAPPING.get(missing_suit, missing_suit)
 
+def sent_key(kind: str, ident) -> str:
+    """Clé d'envoi partagée entre instances, propre au cycle quotidien (reset à 00h59 WAT)."""
+    cycle = (datetime.now(WAT_TZ) - timedelta(minutes=59)).date().isoformat()
+    return f"{cycle}:{kind}:{ident}"
+
 # --- Logique de Prédiction et File d'Attente ---
 
+async def registry(func, *args, **kwargs):
+    """Appelle le registre des envois (SQLite bloquant) hors de la boucle asyncio."""
+    if not election.enabled:
+        return func(*args, **kwargs)
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+def format_prediction_message(game_number: int, suit: str, status: str) -> str:
+    display_suit = SUIT_DISPLAY.get(suit, suit)
+    return f"""😼 {game_number}😺: √{display_suit} statut :{status}"""
+
+def prediction_channel_ready() -> bool:
+    return bool(PREDICTION_CHANNEL_ID and PREDICTION_CHANNEL_ID != 0 and prediction_channel_ok)
+
+def mark_unsynced(game_number: int, pred: dict):
+    """Garde une prédiction à publier ou à mettre à jour plus tard (veille ou erreur)."""
+    unsynced_predictions[game_number] = pred
+    if len(unsynced_predictions) > 100:
+        del unsynced_predictions[min(unsynced_predictions.keys())]
+
+async def publish_prediction(target_game: int, pred: dict) -> bool:
+    """
+    Publie le message d'une prédiction si l'instance est leader (une seule fois entre instances).
+    Retourne False si la publication reste à faire (veille, registre indisponible, échec d'envoi).
+    """
+    if not prediction_channel_ready():
+        logger.warning(f"⚠️ Canal de prédiction non accessible, prédiction non envoyée")
+        return True
+    if not election.is_leader():
+        logger.info(f"💤 Instance en veille: prédiction #{target_game} non envoyée")
+        return False
+
+    key = pred['sent_key']
+    status = pred['status']
+    try:
+        claimed = await registry(election.claim, key, pred['suit'], status)
+    except RegistryError as e:
+        logger.error(f"❌ Registre des envois indisponible, prédiction #{target_game} renvoyée plus tard: {e}")
+        return False
+    if not claimed:
+        logger.info(f"Prédiction #{target_game} déjà envoyée par une autre instance")
+        return await adopt_sent_prediction(target_game, pred)
+
+    try:
+        prediction_msg = format_prediction_message(target_game, pred['suit'], status)
+        pred_msg = await client.send_message(PREDICTION_CHANNEL_ID, prediction_msg)
+    except Exception as e:
+        logger.error(f"❌ Erreur envoi prédiction au canal: {e}")
+        # Annule la réservation pour que l'envoi soit retenté
+        try:
+            await registry(election.unclaim, key)
+        except RegistryError as e:
+            logger.error(f"❌ Erreur annulation de la réservation {key}: {e}")
+        return False
+
+    pred['message_id'] = pred_msg.id
+    logger.info(f"✅ Prédiction envoyée au canal de prédiction {PREDICTION_CHANNEL_ID}")
+    try:
+        await registry(election.update_sent, key, message_id=pred_msg.id)
+    except RegistryError as e:
+        # L'ID sera enregistré lors du prochain rejeu (sync_prediction)
+        logger.error(f"❌ Erreur enregistrement du message {key}: {e}")
+        return False
+    return status == pred['status']
+
+def apply_sent(target_game: int, pred: dict, sent) -> bool:
+    """
+    Reprend le message publié par une autre instance pour cette prédiction.
+    Si sa couleur diffère (jeu N-1 manqué par cette instance), une prédiction en cours adopte
+    celle du message publié pour que la vérification et les éditions restent cohérentes avec
+    le canal ; une prédiction déjà vérifiée avec une autre couleur ne reprend pas le message.
+    """
+    if not sent or sent['message_id'] <= 0:
+        return False
+
+    if sent['value'] and sent['value'] != pred['suit']:
+        if pred['status'] in FINAL_STATUSES:
+            return False
+        logger.warning(f"Prédiction #{target_game}: couleur {pred['suit']} remplacée par {sent['value']} (message publié)")
+        pred['suit'] = sent['value']
+        pred['alternate_suit'] = get_predicted_suit(sent['value'])
+    pred['message_id'] = sent['message_id']
+    return True
+
+async def adopt_sent_prediction(target_game: int, pred: dict) -> bool:
+    try:
+        sent = await registry(election.get_sent, pred['sent_key'])
+    except RegistryError as e:
+        logger.error(f"❌ Erreur lecture du registre pour #{target_game}: {e}")
+        return False
+    return apply_sent(target_game, pred, sent)
+
 async def send_prediction_to_channel(target_game: int, predicted_suit: str, base_game: int):
     """Envoie la prédiction au canal de prédiction et l'ajoute aux prédictions actives."""
     try:
@@ -98,24 +221,9 @@ async def send_prediction_to_channel(target_game: int, predicted_suit: str, base
         # Le backup est +15 jeux après le jeu cible
         backup_game = target_game + PREDICTION_OFFSET 
 
-        display_suit = SUIT_DISPLAY.get(predicted_suit, predicted_suit)
-
-        prediction_msg = f"""😼 {target_game}😺: √{display_suit} statut :🔮"""
-
-        msg_id = 0
-
-        if PREDICTION_CHANNEL_ID and PREDICTION_CHANNEL_ID != 0 and prediction_channel_ok:
-            try:
-                pred_msg = await client.send_message(PREDICTION_CHANNEL_ID, prediction_msg)
-                msg_id = pred_msg.id
-                logger.info(f"✅ Prédiction envoyée au canal de prédiction {PREDICTION_CHANNEL_ID}")
-            except Exception as e:
-                logger.error(f"❌ Erreur envoi prédiction au canal: {e}")
-        else:
-            logger.warning(f"⚠️ Canal de prédiction non accessible, prédiction non envoyée")
-
-        pending_predictions[target_game] = {
-            'message_id': msg_id,
+        pred = {
+            'message_id': 0,
+            'sent_key': sent_key('prediction', target_game),
             'suit': predicted_suit,
             'alternate_suit': alternate_suit, 
             'backup_game': backup_game,
@@ -124,9 +232,13 @@ async def send_prediction_to_channel(target_game: int, predicted_suit: str, base
             'check_count': 0,
             'created_at': datetime.now().isoformat()
         }
+        pending_predictions[target_game] = pred
 
-        logger.info(f"Prédiction active: Jeu #{target_game} - {predicted_suit} (basé sur #{base_game})")
-        return msg_id
+        if not await publish_prediction(target_game, pred):
+            mark_unsynced(target_game, pred)
+
+        logger.info(f"Prédiction active: Jeu #{target_game} - {pred['suit']} (basé sur #{base_game})")
+        return pred['message_id']
 
     except Exception as e:
         logger.error(f"Erreur envoi prédiction: {e}")
@@ -178,6 +290,32 @@ async def check_and_send_queued_predictions(current_game: int):
             logger.warning(f"⚠️ Prédiction #{target_game} expirée (jeu actuel: {current_game}), supprimée")
             queued_predictions.pop(target_game, None)
 
+async def publish_status(game_number: int, pred: dict) -> bool:
+    """
+    Édite le message de prédiction dans le canal.
+    Retourne False si l'édition reste à faire : instance en veille ou message pas encore connu
+    (par exemple envoi toujours en cours lors d'une promotion).
+    """
+    if not prediction_channel_ready():
+        return True
+    if not election.is_leader() or pred['message_id'] <= 0:
+        return False
+
+    status = pred['status']
+    try:
+        updated_msg = format_prediction_message(game_number, pred['suit'], status)
+        await client.edit_message(PREDICTION_CHANNEL_ID, pred['message_id'], updated_msg)
+        logger.info(f"✅ Prédiction #{game_number} mise à jour dans le canal: {status}")
+    except Exception as e:
+        logger.error(f"❌ Erreur mise à jour dans le canal: {e}")
+        return True
+
+    try:
+        await registry(election.update_sent, pred['sent_key'], status=status)
+    except RegistryError as e:
+        logger.error(f"❌ Erreur enregistrement du statut #{game_number}: {e}")
+    return True
+
 async def update_prediction_status(game_number: int, new_status: str):
     """Met à jour le message de prédiction dans le canal et son statut interne."""
     try:
@@ -185,32 +323,58 @@ async def update_prediction_status(game_number: int, new_status: str):
             return False
 
         pred = pending_predictions[game_number]
-        suit = pred['suit']
-        display_suit = SUIT_DISPLAY.get(suit, suit)
-
-        updated_msg = f"""😼 {game_number}😺: √{display_suit} statut :{new_status}"""
-
-        if PREDICTION_CHANNEL_ID and PREDICTION_CHANNEL_ID != 0 and pred['message_id'] > 0 and prediction_channel_ok:
-            try:
-                await client.edit_message(PREDICTION_CHANNEL_ID, pred['message_id'], updated_msg)
-                logger.info(f"✅ Prédiction #{game_number} mise à jour dans le canal: {new_status}")
-            except Exception as e:
-                logger.error(f"❌ Erreur mise à jour dans le canal: {e}")
-
         pred['status'] = new_status
+        published = await publish_status(game_number, pred)
         logger.info(f"Prédiction #{game_number} mise à jour: {new_status}")
 
         # Les prédictions terminées sont supprimées du stock actif
-        if new_status in ['✅0️⃣', '✅1️⃣', '✅2️⃣', '❌']:
+        if new_status in FINAL_STATUSES:
             del pending_predictions[game_number]
             logger.info(f"Prédiction #{game_number} terminée et supprimée")
 
+        # Statut non publié : il sera rejoué quand l'instance sera leader et le message connu
+        if not published:
+            mark_unsynced(game_number, pred)
+
         return True
 
     except Exception as e:
         logger.error(f"Erreur mise à jour prédiction: {e}")
         return False
 
+async def sync_prediction(game_number: int, pred: dict) -> bool:
+    """
+    Rattrape un envoi ou une édition non publiés. Retourne True quand il n'y a plus rien à faire.
+    Lève RegistryError si le registre est indisponible.
+    """
+    key = pred['sent_key']
+    sent = await registry(election.get_sent, key)
+    if sent is None:
+        # Jamais publiée : on l'envoie si elle est toujours en cours
+        if pred['status'] in FINAL_STATUSES:
+            return True
+        return await publish_prediction(game_number, pred)
+
+    if sent['message_id'] <= 0:
+        if pred['message_id'] > 0 and sent['holder'] == election.instance_id:
+            # Message publié par cette instance mais ID non enregistré
+            await registry(election.update_sent, key, message_id=pred['message_id'])
+            sent['message_id'] = pred['message_id']
+        elif datetime.now().timestamp() - sent['created_at'] > STALE_CLAIM_SECONDS:
+            logger.warning(f"Réservation abandonnée pour #{game_number}, nouvel envoi")
+            await registry(election.unclaim, key)
+            return False
+        else:
+            # Envoi toujours en cours
+            return False
+
+    if not apply_sent(game_number, pred, sent):
+        # Message basé sur une autre couleur : on ne le modifie pas
+        return True
+    if sent['status'] != pred['status']:
+        return await publish_status(game_number, pred)
+    return True
+
 def is_message_finalized(message: str) -> bool:
     """Vérifie si le message est un résultat final (non en cours) en utilisant les symboles."""
     if '⏰' in message:
@@ -225,6 +389,12 @@ async def check_prediction_result(game_number: int, first_group: str):
     
     suits_present = get_suits_in_group(first_group)
 
+    # Reprend les messages publiés par l'autre instance avant de vérifier (même couleur que le canal)
+    for pred_game in (game_number, game_number - 1, game_number - 2):
+        pred = pending_predictions.get(pred_game)
+        if pred and pred['message_id'] <= 0:
+            await adopt_sent_prediction(pred_game, pred)
+
     # 1. Vérification du jeu actuel (Jeu Cible N)
     if game_number in pending_predictions:
         pred = pending_predictions[game_number]
@@ -284,6 +454,43 @@ async def check_prediction_result(game_number: int, first_group: str):
 
     return None
 
+def defer_transfer(key: str, transfer_msg: str):
+    if any(deferred_key == key for deferred_key, _ in skipped_transfers):
+        return
+    skipped_transfers.append((key, transfer_msg))
+    if len(skipped_transfers) > 20:
+        skipped_transfers.pop(0)
+
+async def transfer_to_admin(key: str, transfer_msg: str) -> bool:
+    """
+    Transfère un message à l'administrateur depuis le leader.
+    En veille ou si le registre est indisponible, le transfert est mis de côté et rejoué plus tard.
+    Retourne False uniquement si l'envoi a échoué.
+    """
+    if not election.is_leader():
+        defer_transfer(key, transfer_msg)
+        return True
+
+    try:
+        claimed = await registry(election.claim, key)
+    except RegistryError as e:
+        logger.error(f"❌ Registre des envois indisponible, transfert renvoyé plus tard: {e}")
+        defer_transfer(key, transfer_msg)
+        return True
+    if not claimed:
+        return True
+
+    try:
+        await client.send_message(ADMIN_ID, transfer_msg)
+        return True
+    except Exception as e:
+        logger.error(f"❌ Erreur transfert à votre bot: {e}")
+        try:
+            await registry(election.unclaim, key)
+        except RegistryError as e:
+            logger.error(f"❌ Erreur annulation de la réservation {key}: {e}")
+        return False
+
 def check_new_rule_prediction(current_game: int, first_group: str):
     """
     Vérifie le jeu N-1 (précédent) et le jeu actuel (N) pour la condition d'union.
@@ -381,12 +588,9 @@ async def process_finalized_message(message_text: str, chat_id: int):
 
         # --- Transfert à l'administrateur (si activé) ---
         if transfer_enabled and ADMIN_ID and ADMIN_ID != 0 and last_transferred_game != game_number:
-            try:
-                transfer_msg = f"📨 **Message finalisé du canal source:**\n\n{message_text}"
-                await client.send_message(ADMIN_ID, transfer_msg)
+            transfer_msg = f"📨 **Message finalisé du canal source:**\n\n{message_text}"
+            if await transfer_to_admin(sent_key('transfert', game_number), transfer_msg):
                 last_transferred_game = game_number
-            except Exception as e:
-                logger.error(f"❌ Erreur transfert à votre bot: {e}")
         
         # --- Vérification des résultats existants (Triple Chance) ---
         await check_prediction_result(game_number, first_group)
@@ -447,16 +651,28 @@ def is_admin(sender_id):
     """Vérifie si l'ID de l'expéditeur correspond à l'ADMIN_ID configuré."""
     return ADMIN_ID and ADMIN_ID != 0 and sender_id == ADMIN_ID
 
+async def reply(event, text: str):
+    """Répond à une commande uniquement depuis le leader, une seule fois par message."""
+    if not election.is_leader():
+        return
+    try:
+        claimed = await registry(election.claim, sent_key('commande', f"{event.chat_id}_{event.id}"))
+    except RegistryError as e:
+        logger.warning(f"Registre des envois indisponible, réponse envoyée sans réservation: {e}")
+        claimed = True
+    if claimed:
+        await event.respond(text)
+
 @client.on(events.NewMessage(pattern='/start'))
 async def cmd_start(event):
     if event.is_group or event.is_channel: return
-    await event.respond("🤖 **Bot de Prédiction Baccarat**\n\nCommandes: `/status`, `/help`, `/debug`, `/checkchannels`")
+    await reply(event, "🤖 **Bot de Prédiction Baccarat**\n\nCommandes: `/status`, `/help`, `/debug`, `/checkchannels`")
 
 @client.on(events.NewMessage(pattern='/status'))
 async def cmd_status(event):
     if event.is_group or event.is_channel: return
     if not is_admin(event.sender_id):
-        await event.respond("Commande réservée à l'administrateur")
+        await reply(event, "Commande réservée à l'administrateur")
         return
 
     status_msg = f"📊 **État des prédictions:**\n\n🎮 Jeu actuel: #{current_game_number}\n\n"
@@ -474,44 +690,44 @@ async def cmd_status(event):
             distance = game_num - current_game_number
             display_suit = SUIT_DISPLAY.get(pred['predicted_suit'], pred['predicted_suit'])
             status_msg += f"• Jeu #{game_num}: {display_suit} (dans {distance} jeux) - Base sur #{pred['base_game']}\n"
-    await event.respond(status_msg)
+    await reply(event, status_msg)
 
 @client.on(events.NewMessage(pattern='/debug'))
 async def cmd_debug(event):
     if event.is_group or event.is_channel: return
     if not is_admin(event.sender_id):
-        await event.respond("Commande réservée à l'administrateur")
+        await reply(event, "Commande réservée à l'administrateur")
         return
 
-    debug_msg = f"""🔍 **Informations de débogage:**\n\n**Configuration:**\n• Source Channel: {SOURCE_CHANNEL_ID}\n• Prediction Channel: {PREDICTION_CHANNEL_ID}\n• Admin ID: {ADMIN_ID}\n\n**Accès aux canaux:**\n• Canal source: {'✅ OK' if source_channel_ok else '❌ Non accessible'}\n• Canal prédiction: {'✅ OK' if prediction_channel_ok else '❌ Non accessible'}\n\n**État:**\n• Jeu actuel: #{current_game_number}\n• Prédictions actives: {len(pending_predictions)}\n• En file d'attente: {len(queued_predictions)}\n• Offset Prédiction: +{PREDICTION_OFFSET} (Cible N+15)\n• Seuil de proximité: {PROXIMITY_THRESHOLD}\n• Reset Quotidien: 00h59 WAT\n"""
-    await event.respond(debug_msg)
+    debug_msg = f"""🔍 **Informations de débogage:**\n\n**Configuration:**\n• Source Channel: {SOURCE_CHANNEL_ID}\n• Prediction Channel: {PREDICTION_CHANNEL_ID}\n• Admin ID: {ADMIN_ID}\n\n**Accès aux canaux:**\n• Canal source: {'✅ OK' if source_channel_ok else '❌ Non accessible'}\n• Canal prédiction: {'✅ OK' if prediction_channel_ok else '❌ Non accessible'}\n\n**État:**\n• Jeu actuel: #{current_game_number}\n• Prédictions actives: {len(pending_predictions)}\n• En file d'attente: {len(queued_predictions)}\n• Offset Prédiction: +{PREDICTION_OFFSET} (Cible N+15)\n• Seuil de proximité: {PROXIMITY_THRESHOLD}\n• Reset Quotidien: 00h59 WAT\n\n**Haute disponibilité:**\n• Instance: {election.instance_id}\n• Rôle: {'👑 Leader' if election.is_leader() else '💤 Veille'}\n• Bail partagé: {LEADER_LOCK_PATH or 'désactivé'}\n"""
+    await reply(event, debug_msg)
 
 @client.on(events.NewMessage(pattern='/checkchannels'))
 async def cmd_checkchannels(event):
     global source_channel_ok, prediction_channel_ok
     if event.is_group or event.is_channel: return
-    await event.respond("🔍 Vérification des accès aux canaux... (Le statut complet est visible via /debug)")
+    await reply(event, "🔍 Vérification des accès aux canaux... (Le statut complet est visible via /debug)")
 
 @client.on(events.NewMessage(pattern='/transfert|/activetransfert'))
 async def cmd_active_transfert(event):
     if event.is_group or event.is_channel: return
     if not is_admin(event.sender_id):
-        await event.respond("Commande réservée à l'administrateur")
+        await reply(event, "Commande réservée à l'administrateur")
         return
     global transfer_enabled
     transfer_enabled = True
-    await event.respond("✅ Transfert des messages finalisés activé!")
+    await reply(event, "✅ Transfert des messages finalisés activé!")
 
 @client.on(events.NewMessage(pattern='/stoptransfert'))
 async def cmd_stop_transfert(event):
     if event.is_group or event.is_channel: return
     if not is_admin(event.sender_id):
-        await event.respond("Commande réservée à l'administrateur")
+        await reply(event, "Commande réservée à l'administrateur")
         return
 
     global transfer_enabled
     transfer_enabled = False
-    await event.respond("⛔ Transfert des messages désactivé.")
+    await reply(event, "⛔ Transfert des messages désactivé.")
 
 @client.on(events.NewMessage(pattern='/help'))
 async def cmd_help(event):
@@ -519,13 +735,13 @@ async def cmd_help(event):
     
     mapping_str = ", ".join([f"{k} (manquant) -> {v} (prédit)" for k, v in SUIT_MAPPING.items()])
     
-    await event.respond(f"""📖 **Aide - Bot de Prédiction**\n\n**Règles de prédiction (Union N-1 et N):**\n• Condition: L'union des couleurs du 1er groupe de **JEU N-1** et **JEU N** doit avoir **EXACTEMENT 3 couleurs**.\n• Mapping (Couleur manquante \rightarrow Prédite) : {mapping_str}\n• Prédit: Jeu **N + {PREDICTION_OFFSET}** (Cible N+15) avec la couleur mappée.\n\n**Vérification de Résultat (Triple Chance):**\n• Le bot vérifie la couleur prédite sur le Jeu Cible (✅0️⃣), puis sur le Jeu Cible + 1 (✅1️⃣), puis sur le Jeu Cible + 2 (✅2️⃣).\n• Si les trois vérifications échouent, le statut est ❌ et un Backup est envoyé.\n\n**Maintenance:**\n• Reset Quotidien: Toutes les données sont effacées à **00h59 WAT** pour un redémarrage à zéro.\n""")
+    await reply(event, f"""📖 **Aide - Bot de Prédiction**\n\n**Règles de prédiction (Union N-1 et N):**\n• Condition: L'union des couleurs du 1er groupe de **JEU N-1** et **JEU N** doit avoir **EXACTEMENT 3 couleurs**.\n• Mapping (Couleur manquante \rightarrow Prédite) : {mapping_str}\n• Prédit: Jeu **N + {PREDICTION_OFFSET}** (Cible N+15) avec la couleur mappée.\n\n**Vérification de Résultat (Triple Chance):**\n• Le bot vérifie la couleur prédite sur le Jeu Cible (✅0️⃣), puis sur le Jeu Cible + 1 (✅1️⃣), puis sur le Jeu Cible + 2 (✅2️⃣).\n• Si les trois vérifications échouent, le statut est ❌ et un Backup est envoyé.\n\n**Maintenance:**\n• Reset Quotidien: Toutes les données sont effacées à **00h59 WAT** pour un redémarrage à zéro.\n""")
 
 
 # --- Serveur Web et Démarrage ---
 
 async def index(request):
-    html = f"""<!DOCTYPE html><html><head><title>Bot Prédiction Baccarat</title></head><body><h1>🎯 Bot de Prédiction Baccarat</h1><p>Le bot est en ligne et surveille les canaux.</p><p><strong>Jeu actuel:</strong> #{current_game_number}</p></body></html>"""
+    html = f"""<!DOCTYPE html><html><head><title>Bot Prédiction Baccarat</title></head><body><h1>🎯 Bot de Prédiction Baccarat</h1><p>Le bot est en ligne et surveille les canaux.</p><p><strong>Jeu actuel:</strong> #{current_game_number}</p><p><strong>Rôle:</strong> {'Leader' if election.is_leader() else 'Veille'}</p></body></html>"""
     return web.Response(text=html, content_type='text/html', status=200)
 
 async def health_check(request):
@@ -542,9 +758,63 @@ async def start_web_server():
     site = web.TCPSite(runner, '0.0.0.0', PORT)
     await site.start() 
 
+async def replay_unsynced():
+    """Publie ce qui a été mis de côté (veille, registre indisponible, échec d'envoi)."""
+    for game_number, pred in list(unsynced_predictions.items()):
+        if not election.is_leader():
+            return
+        try:
+            done = await sync_prediction(game_number, pred)
+        except Exception as e:
+            logger.error(f"Erreur rattrapage prédiction #{game_number}: {e}")
+            done = False
+        if done and unsynced_predictions.get(game_number) is pred:
+            del unsynced_predictions[game_number]
+
+    transfers = skipped_transfers[:]
+    skipped_transfers.clear()
+    for key, transfer_msg in transfers:
+        if not await transfer_to_admin(key, transfer_msg):
+            defer_transfer(key, transfer_msg)
+
+async def maintain_leadership():
+    """
+    Renouvelle le bail de leadership (ou tente de le prendre) tant que le client Telegram
+    est connecté, et rejoue ce qui n'a pas pu être publié. Un client déconnecté abandonne
+    le bail pour laisser publier l'autre instance.
+    """
+    if election.enabled:
+        logger.info(f"Élection de leader active: instance {election.instance_id}, bail {LEADER_LOCK_PATH}")
+    loop = asyncio.get_running_loop()
+    was_leader = False
+    replay_task = None
+    last_replay = 0.0
+    try:
+        while True:
+            if election.enabled:
+                if client.is_connected():
+                    await asyncio.to_thread(election.try_acquire)
+                elif election.is_leader():
+                    logger.warning("⚠️ Client Telegram déconnecté: abandon du bail de leadership")
+                    await asyncio.to_thread(election.release)
+
+            leader = election.is_leader()
+            promoted = leader and not was_leader
+            pending_work = unsynced_predictions or skipped_transfers
+            replay_due = promoted or (pending_work and loop.time() - last_replay >= REPLAY_INTERVAL)
+            if leader and replay_due and (replay_task is None or replay_task.done()):
+                # Tâche séparée : les envois ne doivent pas retarder le renouvellement du bail
+                replay_task = asyncio.create_task(replay_unsynced())
+                last_replay = loop.time()
+            was_leader = leader
+            await asyncio.sleep(election.renew_interval)
+    finally:
+        if replay_task is not None:
+            replay_task.cancel()
+
 async def schedule_daily_reset():
     """Tâche planifiée pour la réinitialisation quotidienne des stocks de prédiction à 00h59 WAT."""
-    wat_tz = timezone(timedelta(hours=1)) 
+    wat_tz = WAT_TZ
     reset_time = time(0, 59, tzinfo=wat_tz)
 
     logger.info(f"Tâche de reset planifiée pour {reset_time} WAT.")
@@ -568,11 +838,18 @@ async def schedule_daily_reset():
 
         pending_predictions.clear()
         queued_predictions.clear()
+        unsynced_predictions.clear()
+        skipped_transfers.clear()
         recent_games.clear() 
         processed_messages.clear()
         last_transferred_game = None
         current_game_number = 0
         
+        try:
+            await registry(election.purge_sent)
+        except RegistryError as e:
+            logger.error(f"❌ Erreur purge du registre des envois: {e}")
+        
         logger.warning("✅ Toutes les données de prédiction ont été effacées.")
 
 async def start_bot():
@@ -592,23 +869,54 @@ async def start_bot():
 
 async def main():
     """Fonction principale pour lancer le serveur web, le bot et la tâche de reset."""
+    leadership_task = None
+
+    # SIGTERM (redéploiement Render) : arrêt propre pour libérer le bail immédiatement
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass
+
     try:
         await start_web_server()
 
+        # Deux clients sur la même session Telegram se coupent mutuellement les mises à jour
+        if await asyncio.to_thread(election.session_in_use):
+            logger.error("❌ TELEGRAM_SESSION déjà utilisée par une autre instance active: "
+                         "chaque instance doit avoir sa propre session (ou une session vide)")
+            return
+
         success = await start_bot()
         if not success:
             logger.error("Échec du démarrage du bot")
             return
 
+        try:
+            await registry(election.purge_sent)
+        except RegistryError as e:
+            logger.error(f"❌ Erreur purge du registre des envois: {e}")
+
+        # Le bail n'est pris qu'une fois le client connecté
+        leadership_task = asyncio.create_task(maintain_leadership())
+
         # Lancement de la tâche de reset en arrière-plan
         asyncio.create_task(schedule_daily_reset())
         
         logger.info("Bot complètement opérationnel - En attente de messages...")
         await client.run_until_disconnected()
 
+    except asyncio.CancelledError:
+        logger.info("Arrêt demandé (SIGTERM)")
     except Exception as e:
         logger.error(f"Erreur dans main: {e}")
     finally:
+        if leadership_task:
+            leadership_task.cancel()
+            try:
+                await leadership_task
+            except asyncio.CancelledError:
+                pass
+        election.close()
         if client.is_connected():
             await client.disconnect()
 
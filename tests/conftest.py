@@ -0,0 +1,12 @@
+import os
+import sys
+
+# Configuration minimale pour pouvoir importer main.py sans Telegram
+os.environ.setdefault('API_ID', '1')
+os.environ.setdefault('API_HASH', 'test')
+os.environ.setdefault('BOT_TOKEN', 'test')
+os.environ.setdefault('ADMIN_ID', '42')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
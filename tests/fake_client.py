@@ -0,0 +1,56 @@
+"""Faux client Telegram : enregistre les envois et éditions au lieu de les publier."""
+import asyncio
+import json
+import time
+
+
+class FakeMessage:
+    def __init__(self, message_id):
+        self.id = message_id
+
+
+class FakeClient:
+    def __init__(self, log_path=None, instance='', first_id=1):
+        self.calls = []
+        self.connected = True
+        self.log_path = log_path
+        self.instance = instance
+        self._next_id = first_id
+        # Nombre de prochains envois en échec, et délai simulé de chaque envoi
+        self.fail_sends = 0
+        self.send_delay = 0
+
+    def _record(self, call):
+        call['instance'] = self.instance
+        call['time'] = time.time()
+        self.calls.append(call)
+        if self.log_path:
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(call) + '\n')
+
+    def is_connected(self):
+        return self.connected
+
+    async def start(self, bot_token=None):
+        self.connected = True
+
+    async def run_until_disconnected(self):
+        while self.connected:
+            await asyncio.sleep(0.05)
+
+    async def send_message(self, entity, text):
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        if self.fail_sends:
+            self.fail_sends -= 1
+            raise ConnectionError('envoi simulé en échec')
+        message_id = self._next_id
+        self._next_id += 1
+        self._record({'type': 'send', 'entity': entity, 'text': text, 'message_id': message_id})
+        return FakeMessage(message_id)
+
+    async def edit_message(self, entity, message_id, text):
+        self._record({'type': 'edit', 'entity': entity, 'text': text, 'message_id': message_id})
+
+    async def disconnect(self):
+        self.connected = False
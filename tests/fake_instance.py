@@ -0,0 +1,60 @@
+"""
+Lance une instance du bot avec un faux client Telegram.
+
+Usage: python fake_instance.py <lock_db> <instance_id> <log_path> <start_at> <first_message_id>
+
+Toutes les instances rejouent le même flux de jeux (un jeu toutes les GAME_INTERVAL
+secondes à partir de `start_at`), comme si elles recevaient les mêmes événements.
+Les appels au client et la prise de leadership sont écrits dans `log_path`.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+GAME_INTERVAL = 0.1
+GAME_COUNT = 80
+
+
+def game_message(game_number: int) -> str:
+    # Union de deux jeux consécutifs = {♥, ♠, ♦} : une prédiction à chaque jeu
+    first_group = 'A♥️2♠️' if game_number % 2 == 0 else '3♦️'
+    return f"#N{game_number}. ✅ 9({first_group}) - 8(4♣️)"
+
+
+async def run(lock_db, instance_id, log_path, start_at, first_id):
+    os.environ['LEADER_LOCK_PATH'] = lock_db
+    os.environ['INSTANCE_ID'] = instance_id
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import conftest  # noqa: F401  configuration minimale
+    import main
+    from fake_client import FakeClient
+
+    main.client = FakeClient(log_path, instance_id, first_id)
+    main.source_channel_ok = True
+    main.prediction_channel_ok = True
+    asyncio.create_task(main.maintain_leadership())
+
+    async def watch_leadership():
+        while not main.election.is_leader():
+            await asyncio.sleep(0.01)
+        with open(log_path, 'a') as f:
+            f.write(json.dumps({'type': 'leader', 'instance': instance_id, 'time': time.time()}) + '\n')
+
+    asyncio.create_task(watch_leadership())
+
+    for game_number in range(1, GAME_COUNT + 1):
+        delay = start_at + game_number * GAME_INTERVAL - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await main.process_finalized_message(game_message(game_number), main.SOURCE_CHANNEL_ID)
+
+    await asyncio.sleep(1)
+    main.election.close()
+
+
+if __name__ == '__main__':
+    lock_db, instance_id, log_path, start_at, first_id = sys.argv[1:6]
+    asyncio.run(run(lock_db, instance_id, log_path, float(start_at), int(first_id)))
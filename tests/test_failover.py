@@ -0,0 +1,312 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import pytest
+
+import main
+from fake_client import FakeClient
+from leader import LeaderElection, RegistryError
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def read_log(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_two_processes_failover(tmp_path):
+    lock_db = str(tmp_path / 'lease.db')
+    log_a = str(tmp_path / 'a.log')
+    log_b = str(tmp_path / 'b.log')
+    start_at = time.time() + 2.5
+
+    def spawn(instance_id, log_path, first_id):
+        return subprocess.Popen(
+            [sys.executable, os.path.join(HERE, 'fake_instance.py'),
+             lock_db, instance_id, log_path, str(start_at), str(first_id)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+    proc_a = spawn('a', log_a, 1000)
+    deadline = time.time() + 10
+    while not any(c['type'] == 'leader' for c in read_log(log_a)):
+        assert time.time() < deadline, "l'instance a n'est jamais devenue leader"
+        time.sleep(0.05)
+    proc_b = spawn('b', log_b, 2000)
+
+    try:
+        # Laisse le leader publier quelques prédictions puis le tue brutalement
+        time.sleep(start_at + 3.5 - time.time())
+        proc_a.kill()
+        proc_a.wait()
+        killed_at = time.time()
+        assert proc_b.wait(timeout=30) == 0
+    finally:
+        for proc in (proc_a, proc_b):
+            if proc.poll() is None:
+                proc.kill()
+
+    calls_a = [c for c in read_log(log_a) if c['type'] != 'leader']
+    calls_b = [c for c in read_log(log_b) if c['type'] != 'leader']
+    b_leader = [c['time'] for c in read_log(log_b) if c['type'] == 'leader']
+
+    assert any(c['type'] == 'send' for c in calls_a)
+    # La veille ne publie rien tant que le leader détient le bail
+    assert all(c['time'] >= killed_at - 0.05 for c in calls_b)
+    # Bascule en moins d'une seconde, puis reprise des publications
+    assert b_leader and b_leader[0] - killed_at < 1.0
+    assert any(c['type'] == 'send' for c in calls_b)
+    # Aucune double publication
+    sends = Counter((c['entity'], c['text']) for c in calls_a + calls_b if c['type'] == 'send')
+    assert all(count == 1 for count in sends.values()), sends.most_common(3)
+
+
+SIGTERM_SCRIPT = """
+import asyncio, conftest, main
+from fake_client import FakeClient
+main.client = FakeClient()
+asyncio.run(main.main())
+"""
+
+
+def test_sigterm_releases_lease(tmp_path):
+    lock_db = str(tmp_path / 'lease.db')
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, LEADER_LOCK_PATH=lock_db, INSTANCE_ID='a', PORT=str(port))
+    proc = subprocess.Popen([sys.executable, '-c', SIGTERM_SCRIPT], cwd=HERE, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        probe = LeaderElection(lock_db, instance_id='probe')
+        deadline = time.time() + 10
+        while probe.try_acquire():
+            assert time.time() < deadline, "l'instance n'a jamais pris le bail"
+            probe.release()
+            time.sleep(0.05)
+
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=5) == 0
+        # Bail libéré à l'arrêt : reprise immédiate, sans attendre l'expiration
+        assert probe.try_acquire()
+        probe.close()
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    """main.py avec un faux client et un bail partagé, état remis à zéro."""
+    for state in (main.pending_predictions, main.queued_predictions, main.recent_games,
+                  main.processed_messages, main.unsynced_predictions):
+        state.clear()
+    main.skipped_transfers.clear()
+    monkeypatch.setattr(main, 'last_transferred_game', None)
+    monkeypatch.setattr(main, 'prediction_channel_ok', True)
+    monkeypatch.setattr(main, 'client', FakeClient(instance='standby'))
+    election = LeaderElection(str(tmp_path / 'lease.db'), instance_id='standby')
+    monkeypatch.setattr(main, 'election', election)
+    other = LeaderElection(str(tmp_path / 'lease.db'), instance_id='leader')
+    other.try_acquire()
+    yield main, other
+    election.close()
+    other.close()
+
+
+def promote(bot_main, other):
+    other.close()
+    assert bot_main.election.try_acquire()
+    asyncio.run(bot_main.replay_unsynced())
+
+
+def test_standby_posts_unclaimed_prediction_on_promotion(bot):
+    bot_main, other = bot
+    asyncio.run(bot_main.send_prediction_to_channel(20, '♥', 5))
+    assert bot_main.client.calls == []
+
+    promote(bot_main, other)
+
+    sends = [c for c in bot_main.client.calls if c['type'] == 'send']
+    assert len(sends) == 1 and '20' in sends[0]['text']
+    assert bot_main.pending_predictions[20]['message_id'] == sends[0]['message_id']
+
+
+def test_standby_applies_skipped_status_on_promotion(bot):
+    bot_main, other = bot
+    asyncio.run(bot_main.send_prediction_to_channel(20, '♥', 5))
+    key = bot_main.pending_predictions[20]['sent_key']
+    # L'ancien leader a publié la prédiction avant de tomber
+    assert other.claim(key, '♥', '🔮')
+    other.update_sent(key, message_id=77)
+
+    asyncio.run(bot_main.update_prediction_status(20, '✅0️⃣'))
+    assert 20 not in bot_main.pending_predictions
+    assert bot_main.client.calls == []
+
+    promote(bot_main, other)
+
+    assert [(c['type'], c['message_id']) for c in bot_main.client.calls] == [('edit', 77)]
+    assert '✅0️⃣' in bot_main.client.calls[0]['text']
+    assert bot_main.unsynced_predictions == {}
+
+
+def test_promotion_skips_status_already_published(bot):
+    bot_main, other = bot
+    asyncio.run(bot_main.send_prediction_to_channel(20, '♥', 5))
+    key = bot_main.pending_predictions[20]['sent_key']
+    assert other.claim(key, '♥', '🔮')
+    other.update_sent(key, message_id=77, status='❌')
+    asyncio.run(bot_main.update_prediction_status(20, '❌'))
+
+    promote(bot_main, other)
+
+    assert bot_main.client.calls == []
+
+
+def test_adopts_suit_of_message_posted_by_leader(bot):
+    bot_main, other = bot
+    asyncio.run(bot_main.send_prediction_to_channel(20, '♥', 5))
+    key = bot_main.pending_predictions[20]['sent_key']
+    assert other.claim(key, '♠', '🔮')
+    other.update_sent(key, message_id=77)
+
+    # Le jeu cible contient ♠ (couleur publiée) mais pas ♥ (couleur calculée ici)
+    asyncio.run(bot_main.check_prediction_result(20, 'A♠️2♦️'))
+    assert 20 not in bot_main.pending_predictions
+
+    promote(bot_main, other)
+
+    edits = [c for c in bot_main.client.calls if c['type'] == 'edit']
+    assert len(edits) == 1 and edits[0]['message_id'] == 77
+    assert '♠️' in edits[0]['text'] and '✅0️⃣' in edits[0]['text']
+
+
+def test_does_not_edit_message_with_other_suit(bot):
+    bot_main, other = bot
+    asyncio.run(bot_main.send_prediction_to_channel(20, '♥', 5))
+    asyncio.run(bot_main.update_prediction_status(20, '❌'))
+    key = bot_main.unsynced_predictions[20]['sent_key']
+    assert other.claim(key, '♠', '🔮')
+    other.update_sent(key, message_id=77)
+
+    promote(bot_main, other)
+
+    assert bot_main.client.calls == []
+
+
+def test_skipped_transfer_sent_once_on_promotion(bot):
+    bot_main, other = bot
+    asyncio.run(bot_main.transfer_to_admin('k1', 'deja envoye'))
+    asyncio.run(bot_main.transfer_to_admin('k2', 'manque'))
+    assert other.claim('k1')
+
+    promote(bot_main, other)
+
+    assert [c['text'] for c in bot_main.client.calls] == ['manque']
+
+
+def test_disconnected_client_gives_up_lease(bot):
+    bot_main, other = bot
+    other.close()
+    bot_main.client.connected = False
+
+    async def run():
+        task = asyncio.create_task(bot_main.maintain_leadership())
+        await asyncio.sleep(0.3)
+        assert not bot_main.election.is_leader()
+        bot_main.client.connected = True
+        await asyncio.sleep(0.3)
+        assert bot_main.election.is_leader()
+        bot_main.client.connected = False
+        await asyncio.sleep(0.3)
+        task.cancel()
+
+    asyncio.run(run())
+    assert not bot_main.election.is_leader()
+    probe = LeaderElection(bot_main.election.db_path, instance_id='probe')
+    assert probe.try_acquire()
+    probe.close()
+
+
+def test_registry_error_is_retried(bot, monkeypatch):
+    bot_main, other = bot
+    other.close()
+    assert bot_main.election.try_acquire()
+
+    def broken_claim(*args, **kwargs):
+        raise RegistryError('database is locked')
+
+    with monkeypatch.context() as m:
+        m.setattr(bot_main.election, 'claim', broken_claim)
+        asyncio.run(bot_main.send_prediction_to_channel(20, '♥', 5))
+    assert bot_main.client.calls == []
+    assert 20 in bot_main.unsynced_predictions
+
+    asyncio.run(bot_main.replay_unsynced())
+
+    assert [c['type'] for c in bot_main.client.calls] == ['send']
+    assert bot_main.unsynced_predictions == {}
+
+
+def test_failed_send_is_unclaimed_and_retried(bot):
+    bot_main, other = bot
+    other.close()
+    assert bot_main.election.try_acquire()
+    bot_main.client.fail_sends = 1
+
+    asyncio.run(bot_main.send_prediction_to_channel(20, '♥', 5))
+    assert bot_main.election.get_sent(bot_main.pending_predictions[20]['sent_key']) is None
+
+    asyncio.run(bot_main.replay_unsynced())
+
+    assert [c['type'] for c in bot_main.client.calls] == ['send']
+    assert bot_main.pending_predictions[20]['message_id'] > 0
+
+
+def test_status_during_in_flight_send_is_replayed(bot):
+    bot_main, other = bot
+    asyncio.run(bot_main.send_prediction_to_channel(20, '♥', 5))
+    other.close()
+    assert bot_main.election.try_acquire()
+    bot_main.client.send_delay = 0.1
+
+    async def run():
+        replay = asyncio.create_task(bot_main.replay_unsynced())
+        await asyncio.sleep(0.02)
+        # Le résultat arrive pendant que la prédiction est encore en cours d'envoi
+        await bot_main.update_prediction_status(20, '✅0️⃣')
+        await replay
+        assert 20 in bot_main.unsynced_predictions
+        await bot_main.replay_unsynced()
+
+    asyncio.run(run())
+
+    assert [c['type'] for c in bot_main.client.calls] == ['send', 'edit']
+    assert '✅0️⃣' in bot_main.client.calls[1]['text']
+    assert bot_main.unsynced_predictions == {}
+
+
+def test_failed_transfer_is_retried_on_edit(bot):
+    bot_main, other = bot
+    other.close()
+    assert bot_main.election.try_acquire()
+    bot_main.client.fail_sends = 1
+    message = "#N12. ✅ 9(A♥️2♠️) - 8(4♣️)"
+
+    asyncio.run(bot_main.process_finalized_message(message, bot_main.SOURCE_CHANNEL_ID))
+    assert bot_main.last_transferred_game is None
+
+    asyncio.run(bot_main.process_finalized_message(message + ' ', bot_main.SOURCE_CHANNEL_ID))
+    assert bot_main.last_transferred_game == 12
+    assert [c['entity'] for c in bot_main.client.calls] == [bot_main.ADMIN_ID]
@@ -0,0 +1,125 @@
+import time
+
+import pytest
+
+import leader
+from leader import LeaderElection, RegistryError
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'lease.db')
+
+
+def make(db_path, instance_id, **kwargs):
+    kwargs.setdefault('lease_ttl', 0.3)
+    kwargs.setdefault('renew_interval', 0.05)
+    return LeaderElection(db_path, instance_id=instance_id, **kwargs)
+
+
+def test_disabled_is_always_leader():
+    election = LeaderElection('', instance_id='solo')
+    assert election.try_acquire()
+    assert election.is_leader()
+    assert election.claim('k') and election.claim('k')
+    assert election.get_sent('k') is None
+
+
+def test_single_holder(db_path):
+    a, b = make(db_path, 'a'), make(db_path, 'b')
+    assert a.try_acquire()
+    assert not b.try_acquire()
+    assert a.try_acquire()
+    assert a.is_leader() and not b.is_leader()
+
+
+def test_expired_lease_is_taken_over(db_path):
+    a, b = make(db_path, 'a'), make(db_path, 'b')
+    assert a.try_acquire()
+    time.sleep(0.35)
+    assert not a.is_leader()
+    assert b.try_acquire()
+    assert not a.try_acquire()
+
+
+def test_leader_steps_down_before_lease_expires(db_path):
+    a = make(db_path, 'a')
+    a.try_acquire()
+    time.sleep(0.27)
+    # Marge de sécurité : le leader se retire avant que le bail soit libre pour les autres
+    assert not a.is_leader()
+
+
+def test_release_hands_over_immediately(db_path):
+    a, b = make(db_path, 'a'), make(db_path, 'b')
+    a.try_acquire()
+    a.release()
+    assert not a.is_leader()
+    assert b.try_acquire()
+
+
+def test_close_prevents_reacquire(db_path):
+    a, b = make(db_path, 'a'), make(db_path, 'b')
+    a.try_acquire()
+    a.close()
+    assert not a.try_acquire()
+    assert b.try_acquire()
+
+
+def test_claim_dedup(db_path):
+    a, b = make(db_path, 'a'), make(db_path, 'b')
+    assert a.claim('prediction:20', '♥', '🔮')
+    assert not b.claim('prediction:20', '♠', '🔮')
+    a.update_sent('prediction:20', message_id=7)
+    b.update_sent('prediction:20', status='❌')
+    sent = b.get_sent('prediction:20')
+    assert sent.pop('created_at') > 0
+    assert sent == {'message_id': 7, 'value': '♥', 'status': '❌', 'holder': 'a'}
+    assert b.get_sent('prediction:21') is None
+
+
+@pytest.mark.parametrize('lease_ttl, renew_interval', [(0.5, 0.5), (0.5, 0.6), (0.5, 0), (0.5, 0.24)])
+def test_invalid_intervals_rejected(db_path, lease_ttl, renew_interval):
+    with pytest.raises(ValueError):
+        LeaderElection(db_path, lease_ttl=lease_ttl, renew_interval=renew_interval)
+
+
+def test_unclaim_only_unpublished(db_path):
+    a, b = make(db_path, 'a'), make(db_path, 'b')
+    a.claim('k1')
+    a.unclaim('k1')
+    assert b.claim('k1')
+    b.update_sent('k1', message_id=5)
+    b.unclaim('k1')
+    assert not a.claim('k1')
+
+
+def test_purge_sent(db_path, monkeypatch):
+    a = make(db_path, 'a')
+    a.claim('old')
+    monkeypatch.setattr(leader, 'SENT_RETENTION_SECONDS', -1)
+    a.purge_sent()
+    assert a.get_sent('old') is None
+
+
+def test_registry_error_is_not_already_claimed(db_path):
+    a = make(db_path, 'a')
+    a.close()
+    with pytest.raises(RegistryError):
+        a.claim('k')
+    with pytest.raises(RegistryError):
+        a.get_sent('k')
+
+
+def test_shared_session_is_never_leader(db_path):
+    a = make(db_path, 'a', session='meme-session')
+    b = make(db_path, 'b', session='meme-session')
+    c = make(db_path, 'c', session='autre-session')
+    assert a.try_acquire()
+    assert b.session_in_use()
+    assert not c.session_in_use()
+    a.release()
+    assert not b.try_acquire()
+    a.close()
+    assert not b.session_in_use()
+    assert b.try_acquire()